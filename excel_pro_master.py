@@ -5,37 +5,26 @@ Excel Pro Master - Профессиональный генератор стат
 """
 
 import os
+import re
 import sys
 import json
-import tempfile
+import shutil
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Tuple, Any, Optional
-from io import BytesIO
+from typing import List, Dict, Tuple, Any, Optional, Callable
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
 import warnings
 warnings.filterwarnings('ignore')
 
 # Основные библиотеки
 import numpy as np
-import pandas as pd
-from scipy import stats
-from scipy.stats import shapiro, normaltest, jarque_bera, kstest, norm
-
-# Для графиков
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib import rcParams
-import seaborn as sns
-
-# Настройка графиков
-sns.set_style("whitegrid")
-rcParams['font.size'] = 10
-rcParams['font.family'] = 'DejaVu Sans'
-rcParams['axes.unicode_minus'] = False
+# scipy.stats загружается лениво - см. _get_scipy_stats()
+# matplotlib и seaborn загружаются лениво - см. _get_charts_figure()
 
 # Excel
 import xlsxwriter
-from xlsxwriter.utility import xl_rowcol_to_cell, xl_col_to_name
 import subprocess
 
 # GUI
@@ -47,8 +36,8 @@ from tkinter.font import Font
 # КОНСТАНТЫ И ЭТАЛОННЫЕ ДАННЫЕ
 # ============================================================================
 
-# Примеры данных для демонстрации (48 и 25 значений)
-EXAMPLE_DATA_48 = [
+# Примеры данных для демонстрации (48 и 25 значений), сразу как float64-массивы
+EXAMPLE_DATA_48 = np.array([
     101.09, 100.65, 100.93, 101.06, 100.57, 100.98,
     99.37, 100.71, 100.51, 100.58, 101.01, 100.49,
     100.72, 100.67, 100.24, 100.34, 100.23, 100.63,
@@ -57,15 +46,22 @@ EXAMPLE_DATA_48 = [
     100.34, 100.53, 100.20, 102.37, 101.42, 101.08,
     100.46, 101.17, 100.56, 98.97, 100.63, 100.85,
     100.87, 100.78, 102.51, 99.97, 101.11, 100.02
-]
+], dtype=np.float64)
 
-EXAMPLE_DATA_25 = [
+EXAMPLE_DATA_25 = np.array([
     100.71, 100.56, 98.97, 100.63, 100.58,
     100.87, 100.78, 102.51, 99.97, 101.11,
     100.02, 100.55, 100.46, 100.29, 100.84,
     100.98, 100.35, 100.89, 100.67, 101.10,
     99.94, 100.21, 100.58, 100.47, 101.70
-]
+], dtype=np.float64)
+
+# Те же примеры в виде текста для полей ввода ("номер значение" по строке на число)
+EXAMPLE_TEXT_48 = "".join([f"{i} {val:.2f}\n" for i, val in enumerate(EXAMPLE_DATA_48.tolist(), 1)])
+EXAMPLE_TEXT_25 = "".join([f"{i} {val:.2f}\n" for i, val in enumerate(EXAMPLE_DATA_25.tolist(), 1)])
+
+# Данные полей ввода между запусками программы
+SESSION_FILE = Path.home() / '.excelpromaster_cache.json'
 
 # Космическая цветовая схема (Space Theme)
 SPACE_COLORS = {
@@ -82,6 +78,58 @@ SPACE_COLORS = {
     'error': '#ff3366',            # Ошибка (красный неон)
 }
 
+# Стили ttk космической темы (settings для ttk.Style.theme_create)
+SPACE_THEME = {
+    'Space.TFrame': {'configure': {
+        'background': SPACE_COLORS['bg_panel'],
+        'borderwidth': 1,
+        'relief': 'flat'}},
+    'Title.TLabel': {'configure': {
+        'font': ('Orbitron', 20, 'bold'),
+        'foreground': SPACE_COLORS['accent'],
+        'background': SPACE_COLORS['bg_dark']}},
+    'Subtitle.TLabel': {'configure': {
+        'font': ('Segoe UI', 11),
+        'foreground': SPACE_COLORS['text_secondary'],
+        'background': SPACE_COLORS['bg_dark']}},
+    'Header.TLabel': {'configure': {
+        'font': ('Segoe UI', 12, 'bold'),
+        'foreground': SPACE_COLORS['text_primary'],
+        'background': SPACE_COLORS['bg_panel']}},
+    'Space.TNotebook': {'configure': {
+        'background': SPACE_COLORS['bg_panel'],
+        'borderwidth': 0}},
+    'Space.TNotebook.Tab': {
+        'configure': {
+            'background': SPACE_COLORS['bg_panel'],
+            'foreground': SPACE_COLORS['text_secondary'],
+            'padding': [20, 10]},
+        'map': {
+            'background': [('selected', SPACE_COLORS['bg_dark'])],
+            'foreground': [('selected', SPACE_COLORS['accent'])]}},
+    # Кнопки
+    'Space.TButton': {
+        'configure': {
+            'font': ('Segoe UI', 10, 'bold'),
+            'foreground': SPACE_COLORS['text_primary'],
+            'background': SPACE_COLORS['bg_panel'],
+            'borderwidth': 1,
+            'relief': 'flat'},
+        'map': {
+            'background': [('active', SPACE_COLORS['accent'])],
+            'foreground': [('active', SPACE_COLORS['bg_dark'])]}},
+    'Launch.TButton': {
+        'configure': {
+            'font': ('Segoe UI', 13, 'bold'),
+            'foreground': SPACE_COLORS['bg_dark'],
+            'background': SPACE_COLORS['success'],
+            'borderwidth': 2,
+            'relief': 'flat'},
+        'map': {
+            'background': [('active', SPACE_COLORS['accent'])],
+            'foreground': [('active', SPACE_COLORS['text_primary'])]}},
+}
+
 # Цветовая схема для форматирования Excel
 COLORS = {
     'header_main': '#90EE90',      # Светло-зеленый для основных заголовков
@@ -93,6 +141,256 @@ COLORS = {
     'gray': '#F2F2F2',             # Серый для чередования строк
 }
 
+# Общие свойства ячеек с данными
+_DATA_CELL = {'font_size': 10, 'border': 1, 'border_color': '#D0D0D0'}
+
+# Форматы Excel-отчета: имя -> свойства для workbook.add_format()
+EXCEL_FORMATS = {
+    # Заголовок листа (большой, зеленый)
+    'title': {'bold': True, 'font_size': 14, 'align': 'center', 'valign': 'vcenter',
+              'bg_color': COLORS['header_main'], 'border': 2, 'border_color': COLORS['border']},
+    # Заголовки таблиц
+    'header': {'bold': True, 'font_size': 11, 'align': 'center', 'valign': 'vcenter',
+               'bg_color': COLORS['header_main'], 'border': 1, 'border_color': COLORS['border'],
+               'text_wrap': True},
+    # Подзаголовки
+    'subheader': {'bold': True, 'font_size': 10, 'bg_color': COLORS['header_sub'],
+                  'border': 1, 'border_color': COLORS['border']},
+    # Данные - обычные
+    'data': {**_DATA_CELL},
+    # Данные - числовые (2, 4 и 6 знаков)
+    'number2': {**_DATA_CELL, 'num_format': '0.00'},
+    'number4': {**_DATA_CELL, 'num_format': '0.0000'},
+    'number6': {**_DATA_CELL, 'num_format': '0.000000'},
+    # Выделенные ячейки
+    'highlight': {'font_size': 10, 'bold': True, 'border': 1,
+                  'bg_color': COLORS['highlight'], 'border_color': COLORS['border']},
+    # Результат/вывод
+    'result': {'font_size': 11, 'bold': True, 'bg_color': COLORS['data_bg'],
+               'border': 2, 'border_color': COLORS['border'], 'text_wrap': True},
+    # Результаты тестов
+    'error': {'font_size': 11, 'bold': True, 'bg_color': '#FFC7CE', 'border': 1,
+              'font_color': '#9C0006'},
+    'success': {'font_size': 11, 'bold': True, 'bg_color': '#C6EFCE', 'border': 1,
+                'font_color': '#006100'},
+}
+
+# ============================================================================
+# ЛЕНИВАЯ ЗАГРУЗКА ТЯЖЕЛЫХ БИБЛИОТЕК
+# ============================================================================
+
+@functools.lru_cache(maxsize=None)
+def _get_scipy_stats():
+    """Лениво импортирует scipy.stats - только когда нужен анализ"""
+    from scipy import stats
+    return stats
+
+
+@functools.lru_cache(maxsize=None)
+def _get_charts_executor():
+    """Один поток отрисовки на процесс: общую фигуру не рисуют два отчета сразу"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='charts')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_charts_figure():
+    """Фигура 2x2 для листа графиков - создается (и импортирует matplotlib) один раз"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import rcParams
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import seaborn as sns
+    
+    # Настройка графиков
+    sns.set_style("whitegrid")
+    rcParams['font.size'] = 10
+    rcParams['font.family'] = 'DejaVu Sans'
+    rcParams['axes.unicode_minus'] = False
+    # Большие выборки рисуем кусками - Agg не упирается в лимит ячеек пути
+    rcParams['agg.path.chunksize'] = 10000
+    
+    # Рисуем напрямую через Agg-холст, минуя глобальное состояние pyplot.
+    # Поля заданы явно, с запасом под подписи делений от 1e-3 до 1e9:
+    # tight-раскладка перед каждым savefig стоила лишнего прохода отрисовки
+    fig = Figure(figsize=(14, 10))
+    fig.subplots_adjust(left=0.075, right=0.99, bottom=0.06, top=0.955,
+                        wspace=0.18, hspace=0.2)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2, 2)
+    
+    # Оформление осей от данных не зависит - задаем его один раз,
+    # отчеты потом меняют только графики на осях (см. render_charts)
+    chrome = [('Гистограмма плотности', 'Значение', 'Плотность'),
+              ('Q-Q plot: сравнение с нормальным распределением', 'Theoretical quantiles', 'Ordered Values'),
+              ('Ящик с усами (Box Plot)', None, 'Значение'),
+              ('Сравнение плотностей распределения', 'Значение', 'Плотность')]
+    for ax, (title, xlabel, ylabel) in zip(axes.flat, chrome):
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        if xlabel:
+            ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.grid(True, alpha=0.3)
+    return fig, axes
+
+
+# ============================================================================
+# РАЗБОР ВХОДНЫХ ДАННЫХ
+# ============================================================================
+
+# Два непробельных символа, разделенных пробелом/табуляцией, - в строке больше одного поля
+_INNER_SPACE_RE = re.compile(r'\S[ \t]+\S')
+
+# Строка-комментарий: после отступа начинается с '#' или '//'
+_COMMENT_RE = re.compile(r'^[^\S\n]*(?:#|//).*$', re.MULTILINE)
+
+# Строка с данными: непустая и не комментарий (по одному совпадению на строку)
+_DATA_LINE_RE = re.compile(r'^[^\S\n]*(?!#|//)\S', re.MULTILINE)
+
+# Слово, которое float() примет как число (включая '1.', '1_000', 'inf', 'nan')
+_DIGITS = r'\d(?:_?\d)*'
+_FLOAT_RE = re.compile(rf'[-+]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})(?:[eE][-+]?{_DIGITS})?'
+                       r'|inf(?:inity)?|nan)', re.IGNORECASE)
+
+
+def parse_values(text: str) -> np.ndarray:
+    """Разбирает текст с данными - поддерживает вставку из Excel"""
+    normalized = text.replace(',', '.')
+    
+    # Самый быстрый путь: один столбец чисел без комментариев - np.fromstring
+    # разбирает весь буфер сразу; принимаем результат, только если прочитаны все поля.
+    # numpy 1.x на мусоре не падает, а обрывает чтение с DeprecationWarning
+    # (и может оставить числовой префикс поля: '30%' -> 30) - считаем это ошибкой
+    if '#' not in normalized and '//' not in normalized and not _INNER_SPACE_RE.search(normalized):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', DeprecationWarning)
+                values = np.fromstring(normalized, sep=' ')
+        except (ValueError, DeprecationWarning):
+            values = None
+        if values is not None and values.size and values.size == len(normalized.split()):
+            return values
+    
+    # Быстрый путь: ровная таблица чисел ("N значение" или один столбец)
+    # разбирается одним вызовом C-парсера numpy вместо цикла по строкам
+    try:
+        table = np.loadtxt(StringIO(normalized),
+                           comments=('#', '//'), ndmin=2)
+        if table.size:
+            return table[:, 1] if table.shape[1] >= 2 else table[:, 0]
+    except ValueError:
+        pass
+    
+    # Медленный путь: построчный разбор смешанного ввода
+    # (запятые уже заменены на точки во всем буфере сразу)
+    # (строки-комментарии вычищаются одним проходом регулярного выражения)
+    lines = _COMMENT_RE.sub('', normalized).strip().split('\n')
+    # Не больше одного числа на строку - буфер под результат выделяем сразу
+    data = np.empty(len(lines), dtype=np.float64)
+    count = 0
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        # Разбиваем по табуляции (если копируют из Excel)
+        parts = line.split('\t')
+        if len(parts) == 1:
+            # Если нет табуляции, пробуем по пробелам
+            parts = line.split()
+        
+        # Пробуем найти число в строке
+        value = None
+        
+        # Сначала проверяем второй столбец (если есть)
+        if len(parts) >= 2:
+            try:
+                value = float(parts[1])
+            except ValueError:
+                pass
+        
+        # Если не нашли, проверяем первый столбец
+        if value is None and len(parts) >= 1:
+            try:
+                value = float(parts[0])
+            except ValueError:
+                # Если первое значение не число, ищем первое число в строке
+                # (проверка регулярным выражением вместо исключения на каждом слове;
+                # пробелы по краям ячейки float() отбрасывает сам - срезаем и здесь)
+                value = next((float(part) for part in map(str.strip, parts)
+                              if _FLOAT_RE.fullmatch(part)), None)
+        
+        if value is not None:
+            data[count] = value
+            count += 1
+    
+    return data[:count]
+
+
+def _linear_quantile(sorted_data: np.ndarray, q: float) -> float:
+    """Квантиль с линейной интерполяцией (как np.percentile)
+    по отсортированному массиву"""
+    pos = (len(sorted_data) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_data) - 1)
+    t = pos - lo
+    a, b = sorted_data[lo], sorted_data[hi]
+    diff = b - a
+    # Та же формула, что в numpy, чтобы результат совпадал до бита
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+@functools.lru_cache(maxsize=32)
+def _normal_order_medians(n: int) -> Tuple[np.ndarray, np.ndarray, float, float]:
+    """Теоретические квантили Q-Q графика (как в stats.probplot) для выборки из n значений:
+    сами квантили, они же за вычетом среднего, их среднее и сумма квадратов отклонений"""
+    stats = _get_scipy_stats()
+    # Медианы порядковых статистик равномерного распределения (Филлибен) -> один вызов ppf
+    uniform_medians = np.empty(n)
+    uniform_medians[-1] = 0.5 ** (1.0 / n)
+    uniform_medians[0] = 1 - uniform_medians[-1]
+    uniform_medians[1:-1] = (np.arange(2, n) - 0.3175) / (n + 0.365)
+    theoretical = stats.norm.ppf(uniform_medians)
+    mean = theoretical.mean()
+    centered = theoretical - mean
+    # Массивы общие для всех отчетов с тем же n - защищаем от случайной записи
+    theoretical.flags.writeable = False
+    centered.flags.writeable = False
+    return theoretical, centered, float(mean), float(centered @ centered)
+
+
+def _excel_descriptive_values(data: np.ndarray, analyzer: 'StatisticalAnalyzer') -> Dict[str, Any]:
+    """Значения MODE.SNGL, SKEW, KURT и CV так, как их считает Excel (ошибки - строками)"""
+    n = analyzer.n
+    g1 = analyzer.results['skewness']
+    g2 = analyzer.results['kurtosis']
+    degenerate = analyzer.results['std'] == 0
+    
+    # MODE.SNGL: самое частое значение, при равенстве - встретившееся раньше
+    values, first_index, counts = np.unique(data, return_index=True, return_counts=True)
+    if counts.max() < 2:
+        mode = '#N/A'
+    else:
+        candidates = np.flatnonzero(counts == counts.max())
+        mode = float(values[candidates[np.argmin(first_index[candidates])]])
+    
+    # SKEW и KURT - несмещенные оценки, пересчитанные из выборочных g1 и g2
+    if n < 3 or degenerate:
+        skew = '#DIV/0!'
+    else:
+        skew = float(g1 * np.sqrt(n * (n - 1)) / (n - 2))
+    if n < 4 or degenerate:
+        kurt = '#DIV/0!'
+    else:
+        kurt = float(((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)))
+    
+    mean = analyzer.results['mean']
+    cv = '#DIV/0!' if mean == 0 else float(analyzer.results['std'] / mean * 100)
+    
+    return {'mode': mode, 'skew': skew, 'kurt': kurt, 'cv': cv}
+
+
 # ============================================================================
 # КЛАСС ДЛЯ СТАТИСТИЧЕСКОГО АНАЛИЗА
 # ============================================================================
@@ -103,28 +401,49 @@ class StatisticalAnalyzer:
     def __init__(self, data: np.ndarray):
         self.data = np.array(data, dtype=float)
         self.n = len(self.data)
+        # Отсортированная копия - общая для квартилей, Смирнова и Ирвина
+        self._sorted = np.sort(self.data)
         self.results = {}
+        # Результаты тестов - считаются при первом запросе, дальше берутся из кэша
+        self._normality = None
+        self._outliers = {}
         self._calculate_all()
     
     def _calculate_all(self):
         """Вычисляет все статистические показатели"""
+        stats = _get_scipy_stats()
+        
+        n = self.n
         
         # Основная описательная статистика
-        self.results['mean'] = np.mean(self.data)
-        self.results['std'] = np.std(self.data, ddof=1)  # Исправленное СКО
-        self.results['std_pop'] = np.std(self.data)  # Генеральное СКО
-        self.results['variance'] = np.var(self.data, ddof=1)  # Исправленная дисперсия
-        self.results['variance_pop'] = np.var(self.data)  # Генеральная дисперсия
-        self.results['min'] = np.min(self.data)
-        self.results['max'] = np.max(self.data)
+        # Центральные моменты M2..M4 - из одного массива отклонений
+        # вместо отдельных проходов np.var/np.std/stats.skew/stats.kurtosis
+        mean = np.mean(self.data)
+        dev = self.data - mean
+        dev2 = dev * dev
+        sum_sq = np.sum(dev2)
+        m2 = sum_sq / n
+        m3 = np.sum(dev2 * dev) / n
+        m4 = np.sum(dev2 * dev2) / n
+        
+        self.results['mean'] = mean
+        self.results['variance'] = sum_sq / (n - 1)  # Исправленная дисперсия
+        self.results['variance_pop'] = m2  # Генеральная дисперсия
+        self.results['std'] = np.sqrt(self.results['variance'])  # Исправленное СКО
+        self.results['std_pop'] = np.sqrt(m2)  # Генеральное СКО
+        
+        # Порядковые статистики - прямо из отсортированного массива
+        sorted_data = self._sorted
+        self.results['min'] = sorted_data[0]
+        self.results['max'] = sorted_data[n - 1]
         self.results['range'] = self.results['max'] - self.results['min']
-        self.results['median'] = np.median(self.data)
-        self.results['q1'] = np.percentile(self.data, 25)
-        self.results['q3'] = np.percentile(self.data, 75)
+        self.results['median'] = (sorted_data[(n - 1) // 2] + sorted_data[n // 2]) / 2
+        self.results['q1'] = _linear_quantile(sorted_data, 0.25)
+        self.results['q3'] = _linear_quantile(sorted_data, 0.75)
         
         # Моменты и характеристики формы
-        self.results['skewness'] = stats.skew(self.data)
-        self.results['kurtosis'] = stats.kurtosis(self.data, fisher=True)
+        self.results['skewness'] = m3 / m2**1.5
+        self.results['kurtosis'] = m4 / m2**2 - 3  # Эксцесс (по Фишеру)
         self.results['excess_kurtosis'] = self.results['kurtosis']
         
         # Средние
@@ -146,19 +465,25 @@ class StatisticalAnalyzer:
         self.results['ci_mean_upper'] = self.results['mean'] + t_critical * self.results['se']
         
         # Для стандартного отклонения (через хи-квадрат)
-        chi2_lower = stats.chi2.ppf(1 - alpha/2, self.n - 1)
-        chi2_upper = stats.chi2.ppf(alpha/2, self.n - 1)
+        chi2_lower, chi2_upper = stats.chi2.ppf([1 - alpha/2, alpha/2], self.n - 1)
         
         self.results['ci_std_lower'] = np.sqrt((self.n - 1) * self.results['variance'] / chi2_lower)
         self.results['ci_std_upper'] = np.sqrt((self.n - 1) * self.results['variance'] / chi2_upper)
         
     def test_normality(self) -> Dict[str, Any]:
+        """Тесты на нормальность (результат кэшируется - листы вызывают их повторно)"""
+        if self._normality is None:
+            self._normality = self._run_normality_tests()
+        return self._normality
+    
+    def _run_normality_tests(self) -> Dict[str, Any]:
         """Тесты на нормальность распределения"""
+        stats = _get_scipy_stats()
         tests = {}
         
         # Критерий Шапиро-Уилка
         try:
-            stat_shapiro, p_shapiro = shapiro(self.data)
+            stat_shapiro, p_shapiro = stats.shapiro(self.data)
             tests['shapiro'] = {
                 'statistic': stat_shapiro,
                 'p_value': p_shapiro,
@@ -188,36 +513,30 @@ class StatisticalAnalyzer:
             observed, bin_edges = np.histogram(self.data, bins=k)
             
             # Ожидаемые частоты для нормального распределения
-            expected = []
-            for i in range(len(bin_edges) - 1):
-                p = norm.cdf(bin_edges[i+1], self.results['mean'], self.results['std']) - \
-                    norm.cdf(bin_edges[i], self.results['mean'], self.results['std'])
-                expected.append(self.n * p)
-            expected = np.array(expected)
+            # (одна векторная cdf по всем границам интервалов)
+            cdf = stats.norm.cdf(bin_edges, self.results['mean'], self.results['std'])
+            expected = self.n * np.diff(cdf)
             
-            # Объединяем малые группы
+            # Объединяем малые группы (k <= 20, поэтому обычные списки
+            # дешевле, чем np.delete с копированием массива на каждом шаге)
             min_expected = 5
-            while np.any(expected < min_expected) and len(expected) > 2:
-                idx = np.argmin(expected)
-                if idx == 0:
-                    expected[1] += expected[0]
-                    expected = expected[1:]
-                    observed[1] += observed[0]
-                    observed = observed[1:]
-                elif idx == len(expected) - 1:
-                    expected[-2] += expected[-1]
-                    expected = expected[:-1]
-                    observed[-2] += observed[-1]
-                    observed = observed[:-1]
-                else:
-                    expected[idx-1] += expected[idx]
-                    expected = np.delete(expected, idx)
-                    observed[idx-1] += observed[idx]
-                    observed = np.delete(observed, idx)
+            expected = expected.tolist()
+            observed = observed.tolist()
+            while min(expected) < min_expected and len(expected) > 2:
+                idx = expected.index(min(expected))
+                small_expected = expected.pop(idx)
+                small_observed = observed.pop(idx)
+                # Сливаем с левым соседом, а первый интервал - с правым
+                # (после pop правый сосед первого интервала стоит на месте 0)
+                target = 0 if idx == 0 else idx - 1
+                expected[target] += small_expected
+                observed[target] += small_observed
+            expected = np.array(expected)
+            observed = np.array(observed)
             
             chi2_stat = np.sum((observed - expected)**2 / expected)
             df = len(expected) - 3  # k-1-2 (2 параметра: среднее и СКО)
-            p_chi2 = 1 - stats.chi2.cdf(chi2_stat, df) if df > 0 else 0
+            p_chi2 = stats.chi2.sf(chi2_stat, df) if df > 0 else 0
             
             tests['chi2'] = {
                 'statistic': chi2_stat,
@@ -231,7 +550,7 @@ class StatisticalAnalyzer:
         
         # Критерий Колмогорова-Смирнова
         try:
-            stat_ks, p_ks = kstest(self.data, 'norm', args=(self.results['mean'], self.results['std']))
+            stat_ks, p_ks = stats.kstest(self.data, 'norm', args=(self.results['mean'], self.results['std']))
             tests['ks'] = {
                 'statistic': stat_ks,
                 'p_value': p_ks,
@@ -244,25 +563,20 @@ class StatisticalAnalyzer:
         # Критерий Смирнова (модифицированный)
         try:
             # Вычисляем эмпирическую функцию распределения
-            sorted_data = np.sort(self.data)
+            sorted_data = self._sorted
             n = len(self.data)
             # Стандартизируем данные
             z_sorted = (sorted_data - self.results['mean']) / self.results['std']
             
-            # Вычисляем максимальное отклонение
-            d_plus = []
-            d_minus = []
-            for i in range(n):
-                # Теоретическая функция распределения (нормальная)
-                F_theoretical = norm.cdf(z_sorted[i])
-                # Эмпирическая функция распределения
-                F_empirical = (i + 1) / n
-                F_empirical_prev = i / n
-                
-                d_plus.append(F_empirical - F_theoretical)
-                d_minus.append(F_theoretical - F_empirical_prev)
+            # Вычисляем максимальное отклонение (сразу по всему массиву)
+            # Теоретическая функция распределения (нормальная)
+            F_theoretical = stats.norm.cdf(z_sorted)
+            # Эмпирическая функция распределения
+            F_empirical = np.arange(1, n + 1) / n
+            F_empirical_prev = np.arange(n) / n
             
-            D = max(max(d_plus), max(d_minus))
+            D = max((F_empirical - F_theoretical).max(),
+                    (F_theoretical - F_empirical_prev).max())
             
             # Критическое значение (приблизительное)
             if n <= 20:
@@ -286,19 +600,48 @@ class StatisticalAnalyzer:
         return tests
     
     def detect_outliers(self, method='iqr') -> Dict[str, Any]:
-        """Обнаружение выбросов"""
+        """Обнаружение выбросов (результат кэшируется по методу)"""
+        if method not in self._outliers:
+            self._outliers[method] = self._find_outliers(method)
+        return self._outliers[method]
+    
+    def _find_outliers(self, method: str) -> Dict[str, Any]:
+        """Обнаружение выбросов (индексы и значения возвращаются как np.ndarray)"""
+        stats = _get_scipy_stats()
         outliers = {}
         
-        # Метод межквартильного размаха (IQR)
+        # Общие для нескольких критериев величины считаем один раз
+        mean = self.results['mean']
+        std = self.results['std']
+        if method in ('grubbs', 'sharlie', 'all'):
+            z_scores = np.abs((self.data - mean) / std)
+        if method in ('irwin', 'all'):
+            sorted_data = self._sorted
+        
+        # Границы IQR, 3σ и Шовене - все маски получаем за один проход по данным
+        bounds = {}
         if method == 'iqr' or method == 'all':
             iqr = self.results['q3'] - self.results['q1']
-            lower_fence = self.results['q1'] - 1.5 * iqr
-            upper_fence = self.results['q3'] + 1.5 * iqr
+            bounds['iqr'] = (self.results['q1'] - 1.5 * iqr, self.results['q3'] + 1.5 * iqr)
+        if method == '3sigma' or method == 'all':
+            bounds['3sigma'] = (mean - 3 * std, mean + 3 * std)
+        if method == 'chauvenet' or method == 'all':
+            # n * 2 * P(|Z| > z) < 0.5  <=>  z > isf(0.25 / n)
+            z_chauvenet = stats.norm.isf(0.25 / self.n)
+            bounds['chauvenet'] = (mean - z_chauvenet * std, mean + z_chauvenet * std)
+        if bounds:
+            limits = np.array(list(bounds.values()))
+            column = self.data[:, None]
+            masks = dict(zip(bounds, ((column < limits[:, 0]) | (column > limits[:, 1])).T))
+        
+        # Метод межквартильного размаха (IQR)
+        if method == 'iqr' or method == 'all':
+            lower_fence, upper_fence = bounds['iqr']
             
-            outlier_indices = np.where((self.data < lower_fence) | (self.data > upper_fence))[0]
+            outlier_indices = np.flatnonzero(masks['iqr'])
             outliers['iqr'] = {
-                'indices': outlier_indices.tolist(),
-                'values': self.data[outlier_indices].tolist(),
+                'indices': outlier_indices,
+                'values': self.data[outlier_indices],
                 'lower_fence': lower_fence,
                 'upper_fence': upper_fence,
                 'count': len(outlier_indices)
@@ -306,13 +649,12 @@ class StatisticalAnalyzer:
         
         # Метод 3-сигм (Райта)
         if method == '3sigma' or method == 'all':
-            lower_limit = self.results['mean'] - 3 * self.results['std']
-            upper_limit = self.results['mean'] + 3 * self.results['std']
+            lower_limit, upper_limit = bounds['3sigma']
             
-            outlier_indices = np.where((self.data < lower_limit) | (self.data > upper_limit))[0]
+            outlier_indices = np.flatnonzero(masks['3sigma'])
             outliers['3sigma'] = {
-                'indices': outlier_indices.tolist(),
-                'values': self.data[outlier_indices].tolist(),
+                'indices': outlier_indices,
+                'values': self.data[outlier_indices],
                 'lower_limit': lower_limit,
                 'upper_limit': upper_limit,
                 'count': len(outlier_indices)
@@ -320,10 +662,9 @@ class StatisticalAnalyzer:
         
         # Критерий Граббса
         if method == 'grubbs' or method == 'all':
-            sorted_data = np.sort(self.data)
-            z_scores = np.abs((self.data - self.results['mean']) / self.results['std'])
-            max_z = np.max(z_scores)
+            # Максимум берем по индексу argmax - один проход вместо max + argmax
             max_idx = np.argmax(z_scores)
+            max_z = z_scores[max_idx]
             
             # Критическое значение
             alpha = 0.05
@@ -341,8 +682,7 @@ class StatisticalAnalyzer:
         # Критерий Шарлье
         if method == 'sharlie' or method == 'all':
             # Считаем количество точек за пределами 3σ
-            z_scores = np.abs((self.data - self.results['mean']) / self.results['std'])
-            outlier_count = np.sum(z_scores > 3)
+            outlier_count = np.count_nonzero(z_scores > 3)
             
             outliers['sharlie'] = {
                 'outlier_count': int(outlier_count),
@@ -352,11 +692,10 @@ class StatisticalAnalyzer:
         
         # Критерий Ирвина
         if method == 'irwin' or method == 'all':
-            sorted_data = np.sort(self.data)
             diffs = np.diff(sorted_data)
-            lambda_values = diffs / self.results['std']
-            max_lambda = np.max(lambda_values)
+            lambda_values = diffs / std
             max_lambda_idx = np.argmax(lambda_values)
+            max_lambda = lambda_values[max_lambda_idx]
             
             # Критическое значение (упрощенное)
             lambda_critical = 1.7  # для n ≈ 50
@@ -370,18 +709,13 @@ class StatisticalAnalyzer:
         
         # Критерий Шовене
         if method == 'chauvenet' or method == 'all':
-            z_scores = np.abs((self.data - self.results['mean']) / self.results['std'])
-            # Вероятность для каждой точки
-            p = 2 * (1 - norm.cdf(z_scores))
-            # Ожидаемое количество точек
-            n_expected = self.n * p
-            # Выбросы - где ожидается меньше 0.5 точек
-            outlier_mask = n_expected < 0.5
+            # Выбросы - точки, для которых ожидается меньше 0.5 таких отклонений
+            outlier_mask = masks['chauvenet']
             
             outliers['chauvenet'] = {
-                'outlier_indices': np.where(outlier_mask)[0].tolist(),
-                'outlier_values': self.data[outlier_mask].tolist(),
-                'count': int(np.sum(outlier_mask))
+                'outlier_indices': np.flatnonzero(outlier_mask),
+                'outlier_values': self.data[outlier_mask],
+                'count': int(np.count_nonzero(outlier_mask))
             }
         
         return outliers
@@ -396,122 +730,16 @@ class ExcelReportGenerator:
     
     def __init__(self, output_path: str):
         self.output_path = output_path
-        self.workbook = xlsxwriter.Workbook(output_path)
+        # constant_memory: строки сбрасываются на диск по мере записи,
+        # поэтому каждый лист заполняется строго сверху вниз;
+        # use_zip64 снимает лимит в 4 ГБ на части архива для больших выборок
+        self.workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True,
+                                                          'use_zip64': True})
         self.formats = self._create_formats()
         
     def _create_formats(self) -> Dict[str, Any]:
-        """Создает форматы для Excel"""
-        formats = {}
-        
-        # Заголовок листа (большой, зеленый)
-        formats['title'] = self.workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter',
-            'bg_color': COLORS['header_main'],
-            'border': 2,
-            'border_color': COLORS['border'],
-        })
-        
-        # Заголовки таблиц
-        formats['header'] = self.workbook.add_format({
-            'bold': True,
-            'font_size': 11,
-            'align': 'center',
-            'valign': 'vcenter',
-            'bg_color': COLORS['header_main'],
-            'border': 1,
-            'border_color': COLORS['border'],
-            'text_wrap': True,
-        })
-        
-        # Подзаголовки
-        formats['subheader'] = self.workbook.add_format({
-            'bold': True,
-            'font_size': 10,
-            'bg_color': COLORS['header_sub'],
-            'border': 1,
-            'border_color': COLORS['border'],
-        })
-        
-        # Данные - обычные
-        formats['data'] = self.workbook.add_format({
-            'font_size': 10,
-            'border': 1,
-            'border_color': '#D0D0D0',
-        })
-        
-        # Данные - числовые (2 знака)
-        formats['number2'] = self.workbook.add_format({
-            'font_size': 10,
-            'border': 1,
-            'border_color': '#D0D0D0',
-            'num_format': '0.00',
-        })
-        
-        # Данные - числовые (4 знака)
-        formats['number4'] = self.workbook.add_format({
-            'font_size': 10,
-            'border': 1,
-            'border_color': '#D0D0D0',
-            'num_format': '0.0000',
-        })
-        
-        # Данные - числовые (6 знаков)
-        formats['number6'] = self.workbook.add_format({
-            'font_size': 10,
-            'border': 1,
-            'border_color': '#D0D0D0',
-            'num_format': '0.000000',
-        })
-        
-        # Выделенные ячейки
-        formats['highlight'] = self.workbook.add_format({
-            'font_size': 10,
-            'bold': True,
-            'border': 1,
-            'bg_color': COLORS['highlight'],
-            'border_color': COLORS['border'],
-        })
-        
-        # Результат/вывод
-        formats['result'] = self.workbook.add_format({
-            'font_size': 11,
-            'bold': True,
-            'bg_color': COLORS['data_bg'],
-            'border': 2,
-            'border_color': COLORS['border'],
-            'text_wrap': True,
-        })
-        
-        # Формулы
-        formats['formula'] = self.workbook.add_format({
-            'font_size': 10,
-            'border': 1,
-            'bg_color': '#F0F0F0',
-            'border_color': '#D0D0D0',
-            'num_format': '0.0000',
-        })
-        
-        # Форматы для результатов тестов
-        formats['error'] = self.workbook.add_format({
-            'font_size': 11,
-            'bold': True,
-            'bg_color': '#FFC7CE',
-            'border': 1,
-            'font_color': '#9C0006'
-        })
-        
-        formats['success'] = self.workbook.add_format({
-            'font_size': 11,
-            'bold': True,
-            'bg_color': '#C6EFCE',
-            'border': 1,
-            'font_color': '#006100'
-        })
-        
-        return formats
+        """Создает форматы для Excel по таблице EXCEL_FORMATS"""
+        return {name: self.workbook.add_format(props) for name, props in EXCEL_FORMATS.items()}
     
     def create_main_sheet(self, data: np.ndarray, analyzer: StatisticalAnalyzer):
         """Создает основной лист с расчетами как на скриншоте"""
@@ -536,91 +764,101 @@ class ExcelReportGenerator:
         # Записываем данные и формулы
         row_start = 4
         n = len(data)
-        mean = analyzer.results['mean']
-        stats_start_row = 4  # Объявляем переменную перед использованием
-        
-        # Данные
-        for i, value in enumerate(data):
-            row = row_start + i
-            sheet.write(row, 0, i + 1, self.formats['data'])  # Номер
-            sheet.write(row, 1, value, self.formats['number2'])  # Значение
-            
-            # Формулы Excel
-            cell_xj = xl_rowcol_to_cell(row, 1)
-            
-            # Сначала записываем само среднее в правой части
-            if i == 0:  # Только для первой строки
-                mean_row = stats_start_row + 1  # Строка со средним в правой таблице
-                sheet.write_formula(mean_row-1, 10, f'=AVERAGE(B{row_start+1}:B{row_start+n})', self.formats['number4'])
-            
-            # Теперь используем правильную ссылку на среднее
-            cell_mean = f'$K${stats_start_row+1}'  # K5 если stats_start_row = 4
-            
-            # Xj - Xср
-            sheet.write_formula(row, 2, f'={cell_xj}-{cell_mean}', self.formats['number4'])
-            
-            # |Xj - Xср|
-            sheet.write_formula(row, 3, f'=ABS(C{row+1})', self.formats['number4'])
-            
-            # (Xj - Xср)²
-            sheet.write_formula(row, 4, f'=C{row+1}^2', self.formats['number4'])
-            
-            # (Xj - Xср)³
-            sheet.write_formula(row, 5, f'=C{row+1}^3', self.formats['number6'])
-            
-            # (Xj - Xср)⁴
-            sheet.write_formula(row, 6, f'=C{row+1}^4', self.formats['number6'])
-        
-        # Суммы
         sum_row = row_start + n
-        sheet.write(sum_row, 0, 'Σ', self.formats['header'])
-        for col in range(1, 7):
-            col_letter = xl_col_to_name(col)
-            sheet.write_formula(sum_row, col, f'=SUM({col_letter}{row_start+1}:{col_letter}{sum_row})', 
-                               self.formats['highlight'])
+        stats_start_row = 4
         
-        # Статистические показатели в правой части
-        # stats_start_row уже объявлена выше
-        
-        # Основные показатели
-        sheet.write(stats_start_row, 9, 'Показатель', self.formats['header'])
-        sheet.write(stats_start_row, 10, 'Значение', self.formats['header'])
+        # Ячейка со средним в правой таблице (строка 'Среднее X̄' под заголовком)
+        cell_mean = f'$K${stats_start_row+2}'
         
+        # Статистические показатели в правой части: (подпись, формула, кэш значения).
+        # Кэш - то же число, что вернет Excel, чтобы файл открывался уже посчитанным
+        r = analyzer.results
+        excel_stats = _excel_descriptive_values(data, analyzer)
         stats_data = [
-            ('Среднее X̄', f'=AVERAGE(B{row_start+1}:B{sum_row})'),
-            ('Станд. отклонение S', f'=STDEV.S(B{row_start+1}:B{sum_row})'),
-            ('Дисперсия S²', f'=VAR.S(B{row_start+1}:B{sum_row})'),
-            ('Минимум', f'=MIN(B{row_start+1}:B{sum_row})'),
-            ('Максимум', f'=MAX(B{row_start+1}:B{sum_row})'),
-            ('Размах', f'=K{stats_start_row+5}-K{stats_start_row+4}'),
-            ('Медиана', f'=MEDIAN(B{row_start+1}:B{sum_row})'),
-            ('Мода', f'=MODE.SNGL(B{row_start+1}:B{sum_row})'),
-            ('Квартиль Q1', f'=QUARTILE.INC(B{row_start+1}:B{sum_row},1)'),
-            ('Квартиль Q3', f'=QUARTILE.INC(B{row_start+1}:B{sum_row},3)'),
-            ('Асимметрия', f'=SKEW(B{row_start+1}:B{sum_row})'),
-            ('Эксцесс', f'=KURT(B{row_start+1}:B{sum_row})'),
-            ('Коэфф. вариации, %', f'=K{stats_start_row+2}/K{stats_start_row+1}*100'),
+            ('Среднее X̄', f'=AVERAGE(B{row_start+1}:B{sum_row})', r['mean']),
+            ('Станд. отклонение S', f'=STDEV.S(B{row_start+1}:B{sum_row})', r['std']),
+            ('Дисперсия S²', f'=VAR.S(B{row_start+1}:B{sum_row})', r['variance']),
+            ('Минимум', f'=MIN(B{row_start+1}:B{sum_row})', r['min']),
+            ('Максимум', f'=MAX(B{row_start+1}:B{sum_row})', r['max']),
+            ('Размах', f'=K{stats_start_row+6}-K{stats_start_row+5}', r['range']),
+            ('Медиана', f'=MEDIAN(B{row_start+1}:B{sum_row})', r['median']),
+            ('Мода', f'=MODE.SNGL(B{row_start+1}:B{sum_row})', excel_stats['mode']),
+            ('Квартиль Q1', f'=QUARTILE.INC(B{row_start+1}:B{sum_row},1)', r['q1']),
+            ('Квартиль Q3', f'=QUARTILE.INC(B{row_start+1}:B{sum_row},3)', r['q3']),
+            ('Асимметрия', f'=SKEW(B{row_start+1}:B{sum_row})', excel_stats['skew']),
+            ('Эксцесс', f'=KURT(B{row_start+1}:B{sum_row})', excel_stats['kurt']),
+            ('Коэфф. вариации, %', f'=K{stats_start_row+3}/K{stats_start_row+2}*100', excel_stats['cv']),
         ]
         
-        for i, (label, formula) in enumerate(stats_data):
-            row = stats_start_row + i + 1
-            sheet.write(row, 9, label, self.formats['subheader'])
-            if formula.startswith('='):
-                sheet.write_formula(row, 10, formula, self.formats['number4'])
-            else:
-                sheet.write(row, 10, formula, self.formats['number4'])
+        # Правую таблицу раскладываем по строкам: в режиме constant_memory
+        # строки листа пишутся только сверху вниз, вместе со строками данных
+        right_cells = {stats_start_row: [(9, 'Показатель', self.formats['header']),
+                                         (10, 'Значение', self.formats['header'])]}
+        for i, (label, formula, value) in enumerate(stats_data, 1):
+            right_cells[stats_start_row + i] = [(9, label, self.formats['subheader']),
+                                                (10, formula, self.formats['number4'], value)]
         
         # Доверительные интервалы
         ci_row = stats_start_row + len(stats_data) + 3
-        sheet.merge_range(ci_row, 9, ci_row, 10, 'Доверительные интервалы (α=0.05)', self.formats['header'])
-        
-        sheet.write(ci_row+1, 9, 'Для среднего μ', self.formats['subheader'])
-        sheet.write(ci_row+1, 10, f'[{analyzer.results["ci_mean_lower"]:.4f}; {analyzer.results["ci_mean_upper"]:.4f}]', 
-                   self.formats['number4'])
+        right_cells[ci_row+1] = [
+            (9, 'Для среднего μ', self.formats['subheader']),
+            (10, f'[{analyzer.results["ci_mean_lower"]:.4f}; {analyzer.results["ci_mean_upper"]:.4f}]',
+             self.formats['number4']),
+        ]
+        right_cells[ci_row+2] = [
+            (9, 'Для СКО σ', self.formats['subheader']),
+            (10, f'[{analyzer.results["ci_std_lower"]:.4f}; {analyzer.results["ci_std_upper"]:.4f}]',
+             self.formats['number4']),
+        ]
         
-        sheet.write(ci_row+2, 9, 'Для СКО σ', self.formats['subheader'])
-        sheet.write(ci_row+2, 10, f'[{analyzer.results["ci_std_lower"]:.4f}; {analyzer.results["ci_std_upper"]:.4f}]', 
-                   self.formats['number4'])
+        # Результаты формул считаем NumPy заранее и передаем как кэш значения:
+        # в файле остаются формулы Excel, но он открывается уже с готовыми числами
+        dev = data - analyzer.results['mean']
+        dev2 = dev * dev
+        columns = np.column_stack([data, dev, np.abs(dev), dev2, dev2 * dev, dev2 * dev2])
+        column_sums = columns.sum(axis=0).tolist()
+        columns = columns.tolist()
+        
+        # Форматы и методы листа достаем один раз - цикл ниже выполняется n раз
+        # (числа пишем через write_number - без разбора типа в универсальном write)
+        write = sheet.write
+        write_number = sheet.write_number
+        write_formula = sheet.write_formula
+        fmt_data = self.formats['data']
+        fmt_number2 = self.formats['number2']
+        fmt_number4 = self.formats['number4']
+        fmt_number6 = self.formats['number6']
+        
+        for row in range(row_start, max(sum_row, ci_row + 2) + 1):
+            i = row - row_start
+            if i < n:
+                x, d, abs_d, d2, d3, d4 = columns[i]
+                
+                # Данные
+                write_number(row, 0, i + 1, fmt_data)  # Номер
+                write_number(row, 1, x, fmt_number2)  # Значение
+                
+                # Формулы Excel
+                # (столбцы B и C фиксированы - адреса собираем без xl_rowcol_to_cell)
+                excel_row = row + 1
+                cell_xj = f'B{excel_row}'
+                cell_dev = f'C{excel_row}'
+                write_formula(row, 2, f'={cell_xj}-{cell_mean}', fmt_number4, d)  # Xj - Xср
+                write_formula(row, 3, f'=ABS({cell_dev})', fmt_number4, abs_d)  # |Xj - Xср|
+                write_formula(row, 4, f'={cell_dev}^2', fmt_number4, d2)  # (Xj - Xср)²
+                write_formula(row, 5, f'={cell_dev}^3', fmt_number6, d3)  # (Xj - Xср)³
+                write_formula(row, 6, f'={cell_dev}^4', fmt_number6, d4)  # (Xj - Xср)⁴
+            elif row == sum_row:
+                # Суммы
+                write(sum_row, 0, 'Σ', self.formats['header'])
+                for col, (col_letter, total) in enumerate(zip('BCDEFG', column_sums), 1):
+                    write_formula(sum_row, col, f'=SUM({col_letter}{row_start+1}:{col_letter}{sum_row})',
+                                  self.formats['highlight'], total)
+            
+            if row == ci_row:
+                sheet.merge_range(ci_row, 9, ci_row, 10, 'Доверительные интервалы (α=0.05)', self.formats['header'])
+            for col, *args in right_cells.get(row, ()):
+                write(row, col, *args)
         
         return sheet
     
@@ -692,24 +930,54 @@ class ExcelReportGenerator:
         
         # Данные для критерия
         row += 1
-        for i, value in enumerate(data[:25]):  # Первые 25 значений
-            sheet.write(row + i, 0, i + 1, self.formats['data'])
-            sheet.write(row + i, 1, value, self.formats['number2'])
-            # Расчет критерия для каждого значения
-            z_score = abs(value - analyzer.results['mean']) / analyzer.results['std']
-            sheet.write(row + i, 2, z_score, self.formats['number4'])
+        values = data[:25]  # Первые 25 значений
+        # Критерий для всех значений сразу
+        z_scores = np.abs(values - analyzer.results['mean']) / analyzer.results['std']
+        # Пишем построчно: write_column несовместим с constant_memory
+        # (а он все равно вызывает write на каждую ячейку) - сразу write_number
+        write_number = sheet.write_number
+        fmt_data = self.formats['data']
+        fmt_number2 = self.formats['number2']
+        fmt_number4 = self.formats['number4']
+        for i, (value, z_score) in enumerate(zip(values.tolist(), z_scores.tolist())):
+            write_number(row + i, 0, i + 1, fmt_data)
+            write_number(row + i, 1, value, fmt_number2)
+            write_number(row + i, 2, z_score, fmt_number4)
         
         return sheet
     
-    def create_charts_sheet(self, data: np.ndarray, analyzer: StatisticalAnalyzer):
-        """Создает лист с графиками"""
+    def create_charts_sheet(self, data: np.ndarray, analyzer: StatisticalAnalyzer,
+                            image: Optional[BytesIO] = None):
+        """Создает лист с графиками (PNG можно отрисовать заранее через render_charts)"""
         sheet = self.workbook.add_worksheet('Графики')
         
         # Заголовок
         sheet.merge_range('A1:F1', 'ВИЗУАЛИЗАЦИЯ ДАННЫХ', self.formats['title'])
         
-        # Создаем графики matplotlib
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        if image is None:
+            image = self.render_charts(data, analyzer)
+        
+        # Вставляем график в Excel прямо из памяти
+        # Буфер не закрываем: xlsxwriter читает его только в workbook.close()
+        sheet.insert_image('A3', 'dummy.png', {'image_data': image, 'x_scale': 0.9, 'y_scale': 0.9})
+        
+        return sheet
+    
+    def render_charts(self, data: np.ndarray, analyzer: StatisticalAnalyzer) -> BytesIO:
+        """Рисует графики в PNG-буфер (книгу не трогает - можно вызывать из другого потока)"""
+        stats = _get_scipy_stats()
+        
+        # Графики matplotlib рисуем на общей фигуре. С осей убираем только графики
+        # прошлого отчета: заголовки, подписи и сетка остаются (ax.clear пересоздавал
+        # бы их вместе с делениями), пределы осей пересчитываются заново.
+        # Контейнеры (BarContainer от hist) держат ссылки на удаленные столбцы -
+        # их тоже сбрасываем, иначе фигура копит их с каждым отчетом
+        fig, axes = _get_charts_figure()
+        for ax in axes.flat:
+            for artist in (*ax.lines, *ax.patches, *ax.collections):
+                artist.remove()
+            ax.containers.clear()
+            ax.relim()
         
         # 1. Гистограмма с плотностью
         ax1 = axes[0, 0]
@@ -719,60 +987,75 @@ class ExcelReportGenerator:
         
         # Добавляем нормальную кривую
         x = np.linspace(data.min(), data.max(), 100)
-        ax1.plot(x, norm.pdf(x, analyzer.results['mean'], analyzer.results['std']), 
+        ax1.plot(x, stats.norm.pdf(x, analyzer.results['mean'], analyzer.results['std']), 
                 'r-', linewidth=2, label='Норм. распределение')
-        ax1.set_title('Гистограмма плотности', fontsize=12, fontweight='bold')
-        ax1.set_xlabel('Значение')
-        ax1.set_ylabel('Плотность')
         ax1.legend()
-        ax1.grid(True, alpha=0.3)
         
         # 2. Q-Q plot
         ax2 = axes[0, 1]
-        stats.probplot(data, dist="norm", plot=ax2)
-        ax2.set_title('Q-Q plot: сравнение с нормальным распределением', fontsize=12, fontweight='bold')
-        ax2.grid(True, alpha=0.3)
+        # Та же картинка, что у stats.probplot, но по уже отсортированной выборке:
+        # медианы порядковых статистик (Филлибен) -> один вызов ppf -> МНК-прямая
+        # (квантили зависят только от n и кэшируются; прямая - в замкнутом виде)
+        theoretical, centered, mean_theoretical, sum_sq = _normal_order_medians(analyzer.n)
+        ordered = analyzer._sorted
+        slope = centered @ ordered / sum_sq
+        intercept = analyzer.results['mean'] - slope * mean_theoretical
+        ax2.plot(theoretical, ordered, 'bo')
+        ax2.plot(theoretical, slope * theoretical + intercept, 'r-')
         
         # 3. Ящик с усами
         ax3 = axes[1, 0]
-        bp = ax3.boxplot(data, vert=True, patch_artist=True, widths=0.5)
+        # Статистику ящика берем из готовых квартилей и отсортированной выборки
+        # (ax.boxplot заново считал бы перцентили); усы - ближайшие значения внутри
+        # 1.5·IQR, выбросы - в порядке выборки, как у boxplot
+        q1, q3 = analyzer.results['q1'], analyzer.results['q3']
+        iqr = q3 - q1
+        lo = np.searchsorted(ordered, q1 - 1.5 * iqr, 'left')
+        hi = np.searchsorted(ordered, q3 + 1.5 * iqr, 'right')
+        box_stats = {'med': analyzer.results['median'], 'q1': q1, 'q3': q3,
+                     'whislo': min(ordered[lo], q1), 'whishi': max(ordered[hi - 1], q3),
+                     'fliers': data[(data < ordered[lo]) | (data > ordered[hi - 1])]}
+        # bxp дописывает позицию ящика к делениям оси X - деления прошлого отчета сбрасываем
+        from matplotlib.ticker import FixedFormatter, FixedLocator
+        ax3.xaxis.set_major_locator(FixedLocator([]))
+        ax3.xaxis.set_major_formatter(FixedFormatter([]))
+        bp = ax3.bxp([box_stats], patch_artist=True, widths=0.5)
         bp['boxes'][0].set_facecolor('#90EE90')
-        ax3.set_title('Ящик с усами (Box Plot)', fontsize=12, fontweight='bold')
-        ax3.set_ylabel('Значение')
-        ax3.grid(True, alpha=0.3)
         
         # 4. График плотности
         ax4 = axes[1, 1]
-        from scipy.stats import gaussian_kde
-        kde = gaussian_kde(data)
+        kde = stats.gaussian_kde(data)
         x_range = np.linspace(data.min() - 1, data.max() + 1, 200)
-        ax4.plot(x_range, kde(x_range), color='#006400', linewidth=2, label='Эмпирическая')
-        ax4.plot(x_range, norm.pdf(x_range, analyzer.results['mean'], analyzer.results['std']), 
+        if len(data) > 2000:
+            # Большая выборка: бинированная KDE (гистограмма + гауссово сглаживание
+            # с той же шириной окна) - O(n + B) вместо O(n·m) точного расчета
+            from scipy.ndimage import gaussian_filter1d
+            bandwidth = np.sqrt(kde.covariance[0, 0])
+            hist, edges = np.histogram(data, bins=2048, density=True,
+                                       range=(data.min() - 4 * bandwidth, data.max() + 4 * bandwidth))
+            bin_width = edges[1] - edges[0]
+            smoothed = gaussian_filter1d(hist, bandwidth / bin_width, mode='constant')
+            kde_y = np.interp(x_range, edges[:-1] + bin_width / 2, smoothed, left=0, right=0)
+        else:
+            kde_y = kde(x_range)  # O(n·m) - вычисляем один раз для линии и заливки
+        ax4.plot(x_range, kde_y, color='#006400', linewidth=2, label='Эмпирическая')
+        ax4.plot(x_range, stats.norm.pdf(x_range, analyzer.results['mean'], analyzer.results['std']), 
                 'r--', linewidth=2, label='Теоретическая')
-        ax4.fill_between(x_range, kde(x_range), alpha=0.3, color='#90EE90')
-        ax4.set_title('Сравнение плотностей распределения', fontsize=12, fontweight='bold')
-        ax4.set_xlabel('Значение')
-        ax4.set_ylabel('Плотность')
+        ax4.fill_between(x_range, kde_y, alpha=0.3, color='#90EE90')
         ax4.legend()
-        ax4.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
         
         # Сохраняем график в память (без создания файла!)
+        # Фигуру не закрываем - она переиспользуется следующим отчетом.
+        # Без bbox_inches='tight': обрезка полей стоила второго прохода отрисовки
+        # dpi = 96 * 0.9: лист вставляет картинку с масштабом 0.9, и при таком dpi
+        # пиксели PNG совпадают с экранными - Excel не ужимает лишнее (файл на ~20% меньше)
         img_buffer = BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
+        fig.savefig(img_buffer, format='png', dpi=86.4)
         
         # Перематываем буфер в начало
         img_buffer.seek(0)
         
-        # Вставляем график в Excel прямо из памяти
-        sheet.insert_image('A3', 'dummy.png', {'image_data': img_buffer, 'x_scale': 0.9, 'y_scale': 0.9})
-        
-        # Закрываем буфер
-        img_buffer.close()
-        
-        return sheet
+        return img_buffer
     
     def create_outliers_sheet(self, data: np.ndarray, analyzer: StatisticalAnalyzer):
         """Создает лист с анализом выбросов"""
@@ -811,11 +1094,8 @@ class ExcelReportGenerator:
         sheet.merge_range(row, 0, row, 6, 'Критерий Романовского', self.formats['header'])
         row += 2
         
-        romanovsky_values = []
-        for val in data:
-            tau = abs(val - analyzer.results['mean']) / analyzer.results['std']
-            romanovsky_values.append(tau)
-        max_tau = max(romanovsky_values)
+        # max τ = max |Xj - X̄| / S - это уже посчитанное Z-значение Граббса
+        max_tau = grubbs_data.get('max_z_score', 0)
         
         sheet.write(row, 0, 'Макс. значение τ:', self.formats['subheader'])
         sheet.write(row, 1, max_tau, self.formats['number4'])
@@ -867,10 +1147,12 @@ class ExcelReportGenerator:
         chauvenet_data = outliers.get('chauvenet', {})
         sheet.write(row, 0, 'Количество выбросов:', self.formats['subheader'])
         sheet.write(row, 1, chauvenet_data.get('count', 0), self.formats['data'])
-        if chauvenet_data.get('outlier_values'):
+        chauvenet_values = chauvenet_data.get('outlier_values', [])
+        if len(chauvenet_values):
             row += 1
             sheet.write(row, 0, 'Выбросы:', self.formats['subheader'])
-            for i, val in enumerate(chauvenet_data['outlier_values'][:5]):
+            # В Python-числа переводим только то, что реально пишем в Excel
+            for i, val in enumerate(chauvenet_values[:5].tolist()):
                 sheet.write(row, i + 1, val, self.formats['number4'])
         
         # Правило трёх сигм (Райта)
@@ -958,6 +1240,55 @@ class ExcelReportGenerator:
         self.workbook.close()
 
 
+# ============================================================================
+# ПОСТРОЕНИЕ ОТЧЕТА
+# ============================================================================
+
+def build_report(data: np.ndarray, output_path: str,
+                 include_normality: bool = True,
+                 include_charts: bool = False,
+                 include_outliers: bool = True,
+                 progress: Optional[Callable[[str], None]] = None) -> str:
+    """Строит Excel отчет в текущем процессе; progress(этап) сообщает о ходе работы"""
+    if progress is None:
+        progress = lambda stage: None
+    
+    progress('АНАЛИЗ ДАННЫХ')
+    data = np.asarray(data, dtype=float)
+    analyzer = StatisticalAnalyzer(data)
+
+    report = ExcelReportGenerator(output_path)
+
+    # Графики рисуются в фоне, пока пишутся ячейки листов
+    # (сама книга xlsxwriter не потокобезопасна - ее трогает только этот поток)
+    charts = _get_charts_executor().submit(report.render_charts, data, analyzer) if include_charts else None
+
+    # Создаем листы
+    progress('ОСНОВНОЙ ЛИСТ')
+    report.create_main_sheet(data, analyzer)
+
+    if include_normality:
+        progress('ПРОВЕРКА НОРМАЛЬНОСТИ')
+        report.create_normality_sheet(data, analyzer)
+
+    if charts is not None:
+        progress('ГРАФИКИ')
+        report.create_charts_sheet(data, analyzer, charts.result())
+
+    if include_outliers:
+        progress('АНАЛИЗ ВЫБРОСОВ')
+        report.create_outliers_sheet(data, analyzer)
+
+    progress('ВЫВОДЫ')
+    report.create_conclusion_sheet(analyzer)
+
+    # Закрываем файл
+    progress('ЗАПИСЬ ФАЙЛА')
+    report.close()
+
+    return output_path
+
+
 # ============================================================================
 # GUI ИНТЕРФЕЙС
 # ============================================================================
@@ -965,9 +1296,20 @@ class ExcelReportGenerator:
 class ExcelProMasterGUI:
     """Космический GUI для Excel Pro Master в стиле SpaceX"""
     
+    # Подсказка над полем ввода на вкладках с данными
+    DATA_INSTRUCTION = (
+        "// ВСТАВЬТЕ ДАННЫЕ ИЗ EXCEL ИЛИ ВВЕДИТЕ В ФОРМАТЕ:\n" +
+        "// [НОМЕР] [ЗНАЧЕНИЕ] или просто [ЗНАЧЕНИЕ]\n" +
+        "// ПРИМЕР: 1 100.55 или просто 100.55\n" +
+        "// МОЖНО ВСТАВИТЬ СТОЛБЕЦ ИЗ EXCEL ПРЯМО СЮДА!"
+    )
+    
     def __init__(self, root):
         self.root = root
         self.root.title("🚀 Excel Pro Master | Космическая версия")
+        # Окно скрыто, пока строится интерфейс - иначе Tk перерисовывает
+        # его после каждого добавленного виджета
+        self.root.withdraw()
         
         # Размер и позиционирование окна
         window_width = 950
@@ -986,74 +1328,30 @@ class ExcelProMasterGUI:
         
         # Данные
         self.datasets = []
+        # Последний разобранный текст каждой вкладки: {вкладка: (текст, данные)}
+        self._parse_cache = {}
+        # Один фоновый поток на все запуски: отчеты строятся по очереди, GUI не блокируется
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # Содержимое полей с прошлого запуска (пустой словарь - первый запуск)
+        self._session = self._load_session()
         
         # Создаем интерфейс
         self.create_widgets()
         
-        # Загружаем эталонные данные если есть
+        # Восстанавливаем данные прошлого сеанса, если есть
         self.load_reference_data()
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        
+        # Показываем окно один раз, уже целиком собранным
+        self.root.deiconify()
     
     def setup_styles(self):
         """Настройка космических стилей"""
         style = ttk.Style()
-        style.theme_use('clam')
-        
-        # Основные стили в космической теме
-        style.configure('Space.TFrame', 
-                       background=SPACE_COLORS['bg_panel'],
-                       borderwidth=1,
-                       relief='flat')
-        
-        style.configure('Title.TLabel', 
-                       font=('Orbitron', 20, 'bold'),
-                       foreground=SPACE_COLORS['accent'],
-                       background=SPACE_COLORS['bg_dark'])
-        
-        style.configure('Subtitle.TLabel',
-                       font=('Segoe UI', 11),
-                       foreground=SPACE_COLORS['text_secondary'],
-                       background=SPACE_COLORS['bg_dark'])
-        
-        style.configure('Header.TLabel', 
-                       font=('Segoe UI', 12, 'bold'),
-                       foreground=SPACE_COLORS['text_primary'],
-                       background=SPACE_COLORS['bg_panel'])
-        
-        style.configure('Space.TNotebook',
-                       background=SPACE_COLORS['bg_panel'],
-                       borderwidth=0)
-        
-        style.configure('Space.TNotebook.Tab',
-                       background=SPACE_COLORS['bg_panel'],
-                       foreground=SPACE_COLORS['text_secondary'],
-                       padding=[20, 10])
-        
-        style.map('Space.TNotebook.Tab',
-                 background=[('selected', SPACE_COLORS['bg_dark'])],
-                 foreground=[('selected', SPACE_COLORS['accent'])])
-        
-        # Кнопки
-        style.configure('Space.TButton',
-                       font=('Segoe UI', 10, 'bold'),
-                       foreground=SPACE_COLORS['text_primary'],
-                       background=SPACE_COLORS['bg_panel'],
-                       borderwidth=1,
-                       relief='flat')
-        
-        style.map('Space.TButton',
-                 background=[('active', SPACE_COLORS['accent'])],
-                 foreground=[('active', SPACE_COLORS['bg_dark'])])
-        
-        style.configure('Launch.TButton',
-                       font=('Segoe UI', 13, 'bold'),
-                       foreground=SPACE_COLORS['bg_dark'],
-                       background=SPACE_COLORS['success'],
-                       borderwidth=2,
-                       relief='flat')
-        
-        style.map('Launch.TButton',
-                 background=[('active', SPACE_COLORS['accent'])],
-                 foreground=[('active', SPACE_COLORS['text_primary'])])
+        # Вся тема уходит в Tk одним скриптом, а не десятком configure/map
+        if 'space' not in style.theme_names():
+            style.theme_create('space', parent='clam', settings=SPACE_THEME)
+        style.theme_use('space')
     
     def create_widgets(self):
         """Создает космический интерфейс"""
@@ -1069,23 +1367,22 @@ class ExcelProMasterGUI:
         ╚═══════════════════════════════════════════════╝
         """
         
-        # Заголовок
-        title_frame = tk.Frame(main_frame, bg=SPACE_COLORS['bg_dark'])
-        title_frame.grid(row=0, column=0, columnspan=2, pady=(0, 20))
-        
-        # ASCII заголовок
-        ascii_label = tk.Label(title_frame, text=ascii_art, 
-                              font=('Courier', 10), 
-                              fg=SPACE_COLORS['accent'], 
-                              bg=SPACE_COLORS['bg_dark'])
-        ascii_label.pack()
-        
-        subtitle_label = tk.Label(title_frame, 
-                                 text="◈ Система Статистического Анализа ◈", 
-                                 font=('Segoe UI', 12),
-                                 fg=SPACE_COLORS['text_secondary'],
-                                 bg=SPACE_COLORS['bg_dark'])
-        subtitle_label.pack(pady=(0, 10))
+        # Заголовок: один Canvas с двумя текстами вместо фрейма с двумя Label
+        header = tk.Canvas(main_frame, bg=SPACE_COLORS['bg_dark'], highlightthickness=0)
+        header.grid(row=0, column=0, columnspan=2, pady=(0, 20))
+        
+        header.create_text(0, 0, text=ascii_art, anchor=tk.N, justify=tk.CENTER,
+                           font=('Courier', 10),
+                           fill=SPACE_COLORS['accent'])
+        header.create_text(0, header.bbox('all')[3], anchor=tk.N,
+                           text="◈ Система Статистического Анализа ◈",
+                           font=('Segoe UI', 12),
+                           fill=SPACE_COLORS['text_secondary'])
+        
+        # Подгоняем размер холста под текст (плюс прежний отступ под подзаголовком)
+        x0, y0, x1, y1 = header.bbox('all')
+        header.move('all', -x0, -y0)
+        header.configure(width=x1 - x0, height=y1 - y0 + 10)
         
         # Панель с вкладками
         self.notebook = ttk.Notebook(main_frame, style='Space.TNotebook')
@@ -1094,25 +1391,21 @@ class ExcelProMasterGUI:
         # Вкладка 1: Ввод данных (48 строк)
         self.tab1 = tk.Frame(self.notebook, bg=SPACE_COLORS['bg_panel'])
         self.notebook.add(self.tab1, text='◆ ДАННЫЕ-48')
-        self.create_data_tab(self.tab1, 
-            "// ВСТАВЬТЕ ДАННЫЕ ИЗ EXCEL ИЛИ ВВЕДИТЕ В ФОРМАТЕ:\n" +
-            "// [НОМЕР] [ЗНАЧЕНИЕ] или просто [ЗНАЧЕНИЕ]\n" +
-            "// ПРИМЕР: 1 100.55 или просто 100.55\n" +
-            "// МОЖНО ВСТАВИТЬ СТОЛБЕЦ ИЗ EXCEL ПРЯМО СЮДА!", 48)
+        self.create_data_tab(self.tab1, self.DATA_INSTRUCTION, 48)
         
         # Вкладка 2: Ввод данных (25 строк)
         self.tab2 = tk.Frame(self.notebook, bg=SPACE_COLORS['bg_panel'])
         self.notebook.add(self.tab2, text='◆ ДАННЫЕ-25')
-        self.create_data_tab(self.tab2,
-            "// ВСТАВЬТЕ ДАННЫЕ ИЗ EXCEL ИЛИ ВВЕДИТЕ В ФОРМАТЕ:\n" +
-            "// [НОМЕР] [ЗНАЧЕНИЕ] или просто [ЗНАЧЕНИЕ]\n" +
-            "// ПРИМЕР: 1 100.55 или просто 100.55\n" +
-            "// МОЖНО ВСТАВИТЬ СТОЛБЕЦ ИЗ EXCEL ПРЯМО СЮДА!", 25)
         
         # Вкладка 3: Настройки
         self.tab3 = tk.Frame(self.notebook, bg=SPACE_COLORS['bg_panel'])
         self.notebook.add(self.tab3, text='◆ НАСТРОЙКИ')
-        self.create_settings_tab(self.tab3)
+        
+        # Содержимое вкладок 2 и 3 строится при первом открытии
+        self._tab_builders = {1: self._build_data_25_tab,
+                              2: lambda: self.create_settings_tab(self.tab3)}
+        self.notebook.bind('<<NotebookTabChanged>>',
+                           lambda event: self._ensure_tab_built(self.notebook.index(self.notebook.select())))
         
         # Панель управления
         control_frame = tk.Frame(main_frame, bg=SPACE_COLORS['bg_panel'], 
@@ -1170,35 +1463,57 @@ class ExcelProMasterGUI:
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(1, weight=1)
     
+    def _ensure_tab_built(self, index):
+        """Строит содержимое вкладки, если оно еще не создано"""
+        builder = self._tab_builders.pop(index, None)
+        if builder is not None:
+            builder()
+    
+    def _build_data_25_tab(self):
+        """Строит вкладку на 25 строк и заполняет ее данными прошлого сеанса"""
+        self.create_data_tab(self.tab2, self.DATA_INSTRUCTION, 25)
+        if self._session.get('tab25'):
+            self.text_25.insert('1.0', self._session['tab25'])
+    
     def create_data_tab(self, parent, instruction, expected_rows):
         """Создает космическую вкладку для ввода данных"""
-        frame = tk.Frame(parent, bg=SPACE_COLORS['bg_panel'])
+        # Цвета темы - в локальные имена один раз на вызов
+        bg_panel = SPACE_COLORS['bg_panel']
+        accent = SPACE_COLORS['accent']
+        bg_dark = SPACE_COLORS['bg_dark']
+        bg_input = SPACE_COLORS['bg_input']
+        text_primary = SPACE_COLORS['text_primary']
+        success = SPACE_COLORS['success']
+        text_secondary = SPACE_COLORS['text_secondary']
+        warning = SPACE_COLORS['warning']
+        
+        frame = tk.Frame(parent, bg=bg_panel)
         frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
         
         # Инструкция
         tk.Label(frame, text=instruction, 
                 font=('Courier', 10),
-                fg=SPACE_COLORS['accent'],
-                bg=SPACE_COLORS['bg_panel']).pack(pady=(0, 10))
+                fg=accent,
+                bg=bg_panel).pack(pady=(0, 10))
         
         # Текстовое поле
-        text_frame = tk.Frame(frame, bg=SPACE_COLORS['bg_panel'])
+        text_frame = tk.Frame(frame, bg=bg_panel)
         text_frame.pack(fill=tk.BOTH, expand=True)
         
         # Добавляем скролл
         scrollbar = tk.Scrollbar(text_frame, 
-                                bg=SPACE_COLORS['bg_panel'],
-                                troughcolor=SPACE_COLORS['bg_dark'])
+                                bg=bg_panel,
+                                troughcolor=bg_dark)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         text_widget = tk.Text(text_frame, 
                              wrap=tk.NONE, 
                              font=('Courier', 11), 
-                             bg=SPACE_COLORS['bg_input'],
-                             fg=SPACE_COLORS['text_primary'],
-                             insertbackground=SPACE_COLORS['accent'],
-                             selectbackground=SPACE_COLORS['accent'],
-                             selectforeground=SPACE_COLORS['bg_dark'],
+                             bg=bg_input,
+                             fg=text_primary,
+                             insertbackground=accent,
+                             selectbackground=accent,
+                             selectforeground=bg_dark,
                              yscrollcommand=scrollbar.set,
                              relief='flat',
                              borderwidth=2)
@@ -1216,49 +1531,75 @@ class ExcelProMasterGUI:
         count_label = tk.Label(frame, 
                               textvariable=count_var,
                               font=('Courier', 10),
-                              fg=SPACE_COLORS['success'],
-                              bg=SPACE_COLORS['bg_panel'])
+                              fg=success,
+                              bg=bg_panel)
         count_label.pack(pady=5)
         
         # Обновление счетчика
         def update_count(event=None):
-            content = text_widget.get('1.0', tk.END).strip()
-            lines = [l for l in content.split('\n') if l.strip() and not l.startswith('#') and not l.startswith('//')]
-            count = len(lines)
+            nonlocal pending_update
+            pending_update = None
+            # Считаем так же, как parse_values отбирает строки, - одним regex-проходом
+            count = len(_DATA_LINE_RE.findall(text_widget.get('1.0', tk.END)))
             count_var.set(f"◈ СТРОК: {count} / {expected_rows}")
             
             # Меняем цвет в зависимости от количества
             if count == 0:
-                count_label.config(fg=SPACE_COLORS['text_secondary'])
+                count_label.config(fg=text_secondary)
             elif count < expected_rows * 0.8:
-                count_label.config(fg=SPACE_COLORS['warning'])
+                count_label.config(fg=warning)
             else:
-                count_label.config(fg=SPACE_COLORS['success'])
-        
-        text_widget.bind('<KeyRelease>', update_count)
+                count_label.config(fg=success)
+        
+        # Серия правок (или вставка) дает один пересчет через 80 мс после последней
+        pending_update = None
+        
+        def schedule_update(event=None):
+            nonlocal pending_update
+            if pending_update is not None:
+                text_widget.after_cancel(pending_update)
+            pending_update = text_widget.after(80, update_count)
+        
+        # Пересчитываем только при изменении текста (<<Modified>>), а не на каждую
+        # клавишу: стрелки и прокрутка больше не копируют весь буфер из Tk, а вставка
+        # мышью и программные insert/delete тоже обновляют счетчик
+        def on_modified(event=None):
+            # Событие приходит и при сбросе флага - реагируем только на правку
+            if text_widget.edit_modified():
+                text_widget.edit_modified(False)
+                schedule_update()
+        
+        text_widget.bind('<<Modified>>', on_modified)
     
     def create_settings_tab(self, parent):
         """Создает космическую вкладку настроек"""
-        frame = tk.Frame(parent, bg=SPACE_COLORS['bg_panel'])
+        # Цвета темы - в локальные имена один раз на вызов
+        bg_panel = SPACE_COLORS['bg_panel']
+        accent = SPACE_COLORS['accent']
+        bg_input = SPACE_COLORS['bg_input']
+        text_primary = SPACE_COLORS['text_primary']
+        bg_dark = SPACE_COLORS['bg_dark']
+        
+        frame = tk.Frame(parent, bg=bg_panel)
         frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
         # Заголовок секции
         tk.Label(frame, text="◈ ПАПКА ДЛЯ СОХРАНЕНИЯ ◈", 
                 font=('Segoe UI', 11, 'bold'),
-                fg=SPACE_COLORS['accent'],
-                bg=SPACE_COLORS['bg_panel']).grid(row=0, column=0, sticky=tk.W, pady=10)
+                fg=accent,
+                bg=bg_panel).grid(row=0, column=0, sticky=tk.W, pady=10)
         
         self.output_path = tk.StringVar(value=str(Path.home() / "Desktop"))
-        path_frame = tk.Frame(frame, bg=SPACE_COLORS['bg_panel'])
+        path_frame = tk.Frame(frame, bg=bg_panel)
         path_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=5)
         
         path_entry = tk.Entry(path_frame, 
                              textvariable=self.output_path, 
                              width=50,
                              font=('Courier', 10),
-                             bg=SPACE_COLORS['bg_input'],
-                             fg=SPACE_COLORS['text_primary'],
-                             insertbackground=SPACE_COLORS['accent'],
+                             bg=bg_input,
+                             fg=text_primary,
+                             insertbackground=accent,
                              relief='flat',
                              borderwidth=2)
         path_entry.pack(side=tk.LEFT, padx=(0, 10))
@@ -1270,23 +1611,24 @@ class ExcelProMasterGUI:
         # Опции анализа
         tk.Label(frame, text="◈ ПАРАМЕТРЫ АНАЛИЗА ◈", 
                 font=('Segoe UI', 11, 'bold'),
-                fg=SPACE_COLORS['accent'],
-                bg=SPACE_COLORS['bg_panel']).grid(row=2, column=0, sticky=tk.W, pady=(20, 10))
+                fg=accent,
+                bg=bg_panel).grid(row=2, column=0, sticky=tk.W, pady=(20, 10))
         
         # Стиль для чекбоксов
         checkbox_style = {
             'font': ('Segoe UI', 10),
-            'fg': SPACE_COLORS['text_primary'],
-            'bg': SPACE_COLORS['bg_panel'],
-            'selectcolor': SPACE_COLORS['bg_dark'],
-            'activebackground': SPACE_COLORS['bg_panel'],
-            'activeforeground': SPACE_COLORS['accent']
+            'fg': text_primary,
+            'bg': bg_panel,
+            'selectcolor': bg_dark,
+            'activebackground': bg_panel,
+            'activeforeground': accent
         }
         
         self.include_charts = tk.BooleanVar(value=False)  # Отключено по умолчанию
         tk.Checkbutton(frame, 
                       text="◆ Создавать графики (ВНИМАНИЕ: может вызвать ошибки!)", 
                       variable=self.include_charts,
+                      command=self._warm_up_charts,
                       **checkbox_style).grid(row=3, column=0, sticky=tk.W, pady=3)
         
         self.include_outliers = tk.BooleanVar(value=True)
@@ -1307,27 +1649,57 @@ class ExcelProMasterGUI:
                       variable=self.auto_open,
                       **checkbox_style).grid(row=6, column=0, sticky=tk.W, pady=3)
     
+    def _warm_up_charts(self):
+        """Как только графики включены, заранее загружает matplotlib в потоке графиков"""
+        # Импорт matplotlib/seaborn и кэш шрифтов - основная цена первого отчета с графиками;
+        # тот же поток потом и рисует, так что фигуру никто не создаст дважды
+        if self.include_charts.get():
+            _get_charts_executor().submit(_get_charts_figure)
+    
     def choose_folder(self):
         """Выбор папки для сохранения"""
         folder = filedialog.askdirectory(initialdir=self.output_path.get())
         if folder:
             self.output_path.set(folder)
     
+    def _load_session(self):
+        """Читает сохраненные при закрытии данные полей ввода"""
+        try:
+            with open(SESSION_FILE, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(session, dict):
+            return {}
+        return {key: value for key, value in session.items() if isinstance(value, str)}
+    
     def load_reference_data(self):
-        """Загружает примеры данных при запуске"""
+        """Восстанавливает данные прошлого сеанса при запуске"""
+        if not self._session:
+            # Первый запуск: поля пустые, пример - по кнопке
+            self.status_var.set("◆ СИСТЕМА ГОТОВА ◈ ДЛЯ ДЕМО НАЖМИТЕ «ЗАГРУЗИТЬ ПРИМЕР»")
+            return
+        
         # Вставляем в поле для 48 строк
-        if hasattr(self, 'text_48'):
-            text = ""
-            for i, val in enumerate(EXAMPLE_DATA_48, 1):
-                text += f"{i} {val:.2f}\n"
-            self.text_48.insert('1.0', text)
+        if hasattr(self, 'text_48') and self._session.get('tab48'):
+            self.text_48.insert('1.0', self._session['tab48'])
         
-        # Вставляем в поле для 25 строк
+        # Вставляем в поле для 25 строк (если вкладка уже построена)
+        if hasattr(self, 'text_25') and self._session.get('tab25'):
+            self.text_25.insert('1.0', self._session['tab25'])
+    
+    def on_close(self):
+        """Сохраняет данные полей ввода и закрывает окно"""
+        self._session['tab48'] = self.text_48.get('1.0', 'end-1c')
+        # Непостроенная вкладка хранит данные прошлого сеанса без изменений
         if hasattr(self, 'text_25'):
-            text = ""
-            for i, val in enumerate(EXAMPLE_DATA_25, 1):
-                text += f"{i} {val:.2f}\n"
-            self.text_25.insert('1.0', text)
+            self._session['tab25'] = self.text_25.get('1.0', 'end-1c')
+        try:
+            with open(SESSION_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self._session, f, ensure_ascii=False)
+        except OSError:
+            pass  # Не удалось сохранить - в следующий раз просто начнем с пустых полей
+        self.root.destroy()
     
     def paste_example(self):
         """Вставляет пример данных"""
@@ -1335,16 +1707,10 @@ class ExcelProMasterGUI:
         
         if current_tab == 0:  # 48 строк
             self.text_48.delete('1.0', tk.END)
-            text = ""
-            for i, val in enumerate(EXAMPLE_DATA_48, 1):
-                text += f"{i} {val:.2f}\n"
-            self.text_48.insert('1.0', text)
+            self.text_48.insert('1.0', EXAMPLE_TEXT_48)
         elif current_tab == 1:  # 25 строк
             self.text_25.delete('1.0', tk.END)
-            text = ""
-            for i, val in enumerate(EXAMPLE_DATA_25, 1):
-                text += f"{i} {val:.2f}\n"
-            self.text_25.insert('1.0', text)
+            self.text_25.insert('1.0', EXAMPLE_TEXT_25)
     
     def clear_data(self):
         """Очищает поля ввода"""
@@ -1380,72 +1746,41 @@ class ExcelProMasterGUI:
     
     def parse_data(self, text):
         """Парсит введенные данные - поддерживает вставку из Excel"""
-        lines = text.strip().split('\n')
-        data = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#') or line.startswith('//'):
-                continue
-            
-            # Заменяем запятую на точку для дробной части
-            line = line.replace(',', '.')
-            
-            # Разбиваем по табуляции (если копируют из Excel)
-            parts = line.split('\t')
-            if len(parts) == 1:
-                # Если нет табуляции, пробуем по пробелам
-                parts = line.split()
-            
-            # Пробуем найти число в строке
-            value = None
-            
-            # Сначала проверяем второй столбец (если есть)
-            if len(parts) >= 2:
-                try:
-                    value = float(parts[1])
-                except ValueError:
-                    pass
-            
-            # Если не нашли, проверяем первый столбец
-            if value is None and len(parts) >= 1:
-                try:
-                    value = float(parts[0])
-                except ValueError:
-                    # Если первое значение не число, ищем первое число в строке
-                    for part in parts:
-                        try:
-                            value = float(part)
-                            break
-                        except ValueError:
-                            continue
-            
-            if value is not None:
-                data.append(value)
-        
-        return np.array(data)
+        return parse_values(text)
     
     def generate_report(self):
-        """Генерирует отчет"""
+        """Генерирует отчет (расчет и запись файла - в фоновом потоке)"""
+        # Параметры отчета живут на вкладке настроек - она нужна, даже если ее не открывали
+        self._ensure_tab_built(2)
         try:
             self.status_var.set("◈ ИНИЦИАЛИЗАЦИЯ АНАЛИЗА...")
-            self.generate_btn.config(state='disabled')
             
             # Определяем какая вкладка активна
             current_tab = self.notebook.index(self.notebook.select())
             
             if current_tab == 0:
-                text = self.text_48.get('1.0', tk.END)
+                text_widget = self.text_48
                 expected = 48
             elif current_tab == 1:
-                text = self.text_25.get('1.0', tk.END)
+                text_widget = self.text_25
                 expected = 25
             else:
                 messagebox.showwarning("Внимание", "Выберите вкладку с данными!")
                 return
             
-            # Парсим данные
-            data = self.parse_data(text)
+            # Пустое поле видно по индексам, без копирования текста из Tk
+            if text_widget.compare('end-1c', '==', '1.0'):
+                messagebox.showerror("Ошибка", "Нет данных для анализа!")
+                return
+            text = text_widget.get('1.0', tk.END)
+            
+            # Парсим данные (повторный запуск без правок берет прошлый результат)
+            cached = self._parse_cache.get(current_tab)
+            if cached is not None and cached[0] == text:
+                data = cached[1]
+            else:
+                data = self.parse_data(text)
+                self._parse_cache[current_tab] = (text, data)
             
             if len(data) == 0:
                 messagebox.showerror("Ошибка", "Нет данных для анализа!")
@@ -1457,53 +1792,62 @@ class ExcelProMasterGUI:
                     f"Введено {len(data)} значений вместо ожидаемых {expected}.\nПродолжить?"):
                     return
             
-            # Создаем анализатор
-            analyzer = StatisticalAnalyzer(data)
-            
             # Путь для сохранения
-            timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"Statistical_Report_{timestamp}.xlsx"
             output_path = os.path.join(self.output_path.get(), filename)
-            
-            # Создаем Excel отчет
-            report = ExcelReportGenerator(output_path)
-            
-            # Создаем листы
-            report.create_main_sheet(data, analyzer)
-            
-            if self.include_normality.get():
-                report.create_normality_sheet(data, analyzer)
-            
-            if self.include_charts.get():
-                report.create_charts_sheet(data, analyzer)
-            
-            if self.include_outliers.get():
-                report.create_outliers_sheet(data, analyzer)
-            
-            report.create_conclusion_sheet(analyzer)
-            
-            # Закрываем файл
-            report.close()
-            
-            self.status_var.set(f"◆ АНАЛИЗ ЗАВЕРШЁН: {filename}")
+
+            # Значения tk-переменных читаем здесь - из фонового потока их трогать нельзя
+            options = dict(include_normality=self.include_normality.get(),
+                           include_charts=self.include_charts.get(),
+                           include_outliers=self.include_outliers.get())
+        except Exception as e:
+            self._on_report_failed(e)
+            return
+
+        self.generate_btn.config(state='disabled')
+        self.status_var.set("◈ ФОРМИРОВАНИЕ ОТЧЁТА...")
+        self._executor.submit(self._build_report_worker, data, output_path, options)
+
+    def _build_report_worker(self, data, output_path, options):
+        """Строит отчет в фоновом потоке, итог передает в главный поток"""
+        # Этапы показываем в строке состояния - обновление тоже через главный поток
+        def progress(stage):
+            self.root.after(0, self.status_var.set, f"◈ ФОРМИРОВАНИЕ ОТЧЁТА: {stage}...")
+        
+        try:
+            build_report(data, output_path, progress=progress, **options)
+        except Exception as e:
+            self.root.after(0, self._on_report_failed, e)
+        else:
+            self.root.after(0, self._on_report_done, output_path)
+
+    def _on_report_done(self, output_path):
+        """Завершение генерации (выполняется в главном потоке Tk)"""
+        self.generate_btn.config(state='normal')
+        try:
+            self.status_var.set(f"◆ АНАЛИЗ ЗАВЕРШЁН: {os.path.basename(output_path)}")
             
             # Открываем файл если нужно
+            # (posix_spawn вместо fork() всего процесса с загруженными numpy/scipy/tk
+            # CPython берет только при close_fds=False и полном пути к программе)
             if self.auto_open.get():
                 if sys.platform == 'win32':
                     os.startfile(output_path)
-                elif sys.platform == 'darwin':
-                    subprocess.run(['open', output_path])
                 else:
-                    subprocess.run(['xdg-open', output_path])
+                    opener = 'open' if sys.platform == 'darwin' else 'xdg-open'
+                    subprocess.run([shutil.which(opener) or opener, output_path],
+                                   close_fds=False, stdin=subprocess.DEVNULL)
             
             messagebox.showinfo("Успех!", f"Отчёт успешно создан!\n\n{output_path}")
-            
         except Exception as e:
-            self.status_var.set("◆ ОШИБКА: АНАЛИЗ НЕ ВЫПОЛНЕН")
-            messagebox.showerror("Ошибка", f"Произошла ошибка:\n\n{str(e)}")
-        finally:
-            self.generate_btn.config(state='normal')
+            self._on_report_failed(e)
 
+    def _on_report_failed(self, error):
+        """Сообщает об ошибке генерации (выполняется в главном потоке Tk)"""
+        self.generate_btn.config(state='normal')
+        self.status_var.set("◆ ОШИБКА: АНАЛИЗ НЕ ВЫПОЛНЕН")
+        messagebox.showerror("Ошибка", f"Произошла ошибка:\n\n{str(error)}")
 
 # ============================================================================
 # ГЛАВНАЯ ФУНКЦИЯ